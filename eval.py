@@ -1,21 +1,29 @@
 import os
 import re
 import sys
+import json
 import time
-import psutil
+import shutil
 import signal
 import asyncio
+import hashlib
 import logging
 import tempfile
-import traceback
 import threading
 import subprocess
 from functools import (
-    wraps
+    wraps,
+    lru_cache
 )
-from http.server import (
-    HTTPServer,
-    BaseHTTPRequestHandler
+from collections import (
+    OrderedDict
+)
+from importlib.util import (
+    find_spec
+)
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    as_completed
 )
 from typing import (
     Any,
@@ -52,6 +60,7 @@ from telegram.error import (
 BOT_USERNAME = "iCodeEvalBot"  # Replace with your bot username
 UPDATES_CHANNEL = "https://t.me/WorkGlows"
 SUPPORT_GROUP = "https://t.me/SoulMeetsHQ"
+ADD_TO_GROUP_URL = f"https://t.me/{BOT_USERNAME}?startgroup=true"
 MAX_MESSAGE_LENGTH = 400  # Character limit for messages
 
 # Color codes for logging
@@ -115,8 +124,17 @@ def setup_colored_logging():
 logger = setup_colored_logging()
 
 # UTILITY FUNCTIONS
+# Recently extracted user info keyed by id() of the source message. The
+# message is kept in the entry so its id cannot be reused while cached.
+_USER_INFO_CACHE: "OrderedDict[int, Tuple[Message, Dict[str, Any]]]" = OrderedDict()
+_USER_INFO_CACHE_SIZE = 256
+
 def extract_user_info(msg: Message) -> Dict[str, any]:
-    """Extract user and chat information from message"""
+    """Extract user and chat information from message, cached per message"""
+    cached = _USER_INFO_CACHE.get(id(msg))
+    if cached is not None and cached[0] is msg:
+        return cached[1]
+
     try:
         logger.debug("🔍 Extracting user information from message")
         u = msg.from_user
@@ -135,6 +153,7 @@ def extract_user_info(msg: Message) -> Dict[str, any]:
                 "chat_link": "No Link",
             }
         
+        cu = getattr(c, 'username', None)
         info = {
             "user_id": getattr(u, 'id', 'unknown'),
             "username": getattr(u, 'username', 'unknown'),
@@ -142,18 +161,22 @@ def extract_user_info(msg: Message) -> Dict[str, any]:
             "chat_id": getattr(c, 'id', 'unknown'),
             "chat_type": getattr(c, 'type', 'unknown'),
             "chat_title": getattr(c, 'title', None) or getattr(c, 'first_name', None) or "unknown",
-            "chat_username": f"@{c.username}" if getattr(c, 'username', None) else "No Username",
-            "chat_link": f"https://t.me/{c.username}" if getattr(c, 'username', None) else "No Link",
+            "chat_username": "@" + cu if cu else "No Username",
+            "chat_link": "https://t.me/" + cu if cu else "No Link",
         }
         
         logger.info(
-            f"📑 User info extracted: {info['full_name']} (@{info['username']}) "
-            f"[ID: {info['user_id']}] in {info['chat_title']} [{info['chat_id']}] {info['chat_link']}"
+            "📑 User info extracted: %s (@%s) [ID: %s] in %s [%s] %s",
+            info['full_name'], info['username'], info['user_id'],
+            info['chat_title'], info['chat_id'], info['chat_link']
         )
+
+        _USER_INFO_CACHE[id(msg)] = (msg, info)
+        if len(_USER_INFO_CACHE) > _USER_INFO_CACHE_SIZE:
+            _USER_INFO_CACHE.popitem(last=False)
         return info
     except Exception as e:
-        logger.error(f"❌ Error extracting user info: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("❌ Error extracting user info: %s", e, exc_info=True)
         return {
             "user_id": "error",
             "username": "error",
@@ -165,30 +188,32 @@ def extract_user_info(msg: Message) -> Dict[str, any]:
             "chat_link": "Error",
         }
 
-def log_with_user_info(level: str, message: str, user_info: Dict[str, any]) -> None:
-    """Log message with user information"""
+# Log level names accepted by log_with_user_info
+_LEVEL_MAP = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+def log_with_user_info(level: str, message: str, user_info: Dict[str, any], exc_info: bool = False) -> None:
+    """Log message with user information, optionally with the current traceback"""
     try:
-        user_detail = (
-            f"👤 {user_info['full_name']} (@{user_info['username']}) "
-            f"[ID: {user_info['user_id']}] | "
-            f"💬 {user_info['chat_title']} [{user_info['chat_id']}] "
-            f"({user_info['chat_type']}) {user_info['chat_link']}"
+        level_int = _LEVEL_MAP.get(level) or _LEVEL_MAP.get(level.upper(), logging.INFO)
+        if not logger.isEnabledFor(level_int):
+            return
+
+        logger.log(
+            level_int,
+            "%s | 👤 %s (@%s) [ID: %s] | 💬 %s [%s] (%s) %s",
+            message,
+            user_info['full_name'], user_info['username'], user_info['user_id'],
+            user_info['chat_title'], user_info['chat_id'],
+            user_info['chat_type'], user_info['chat_link'],
+            exc_info=exc_info
         )
-        full_message = f"{message} | {user_detail}"
-
-        level_upper = level.upper()
-        if level_upper == "INFO":
-            logger.info(full_message)
-        elif level_upper == "DEBUG":
-            logger.debug(full_message)
-        elif level_upper == "WARNING":
-            logger.warning(full_message)
-        elif level_upper == "ERROR":
-            logger.error(full_message)
-        else:
-            logger.info(full_message)
     except Exception as e:
-        logger.error(f"❌ Error in log_with_user_info: {str(e)}")
+        logger.error("❌ Error in log_with_user_info: %s", e)
 
 def error_handler_decorator(func):
     """Decorator to handle errors in handler functions"""
@@ -202,51 +227,55 @@ def error_handler_decorator(func):
             
             return await func(update, context)
         except TelegramError as e:
+            # One record carries the message, user context and traceback
             error_msg = f"🔴 Telegram API error in {func.__name__}: {str(e)}"
-            logger.error(error_msg)
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            
             if user_info:
-                log_with_user_info("ERROR", error_msg, user_info)
+                log_with_user_info("ERROR", error_msg, user_info, exc_info=True)
+            else:
+                logger.error("%s", error_msg, exc_info=True)
             
             try:
                 if update and update.message:
-                    await update.message.reply_text(
-                        "❌ <b>Telegram API Error</b>\n\n"
-                        "There was an issue communicating with Telegram. Please try again later.",
-                        parse_mode='HTML'
-                    )
+                    await update.message.reply_text(_TELEGRAM_API_ERROR_HTML, parse_mode='HTML')
             except Exception as nested_e:
-                logger.error(f"❌ Failed to send error message: {str(nested_e)}")
+                logger.error("❌ Failed to send error message: %s", nested_e)
         
         except Exception as e:
             error_msg = f"🔴 Unexpected error in {func.__name__}: {str(e)}"
-            logger.error(error_msg)
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            
             if user_info:
-                log_with_user_info("ERROR", error_msg, user_info)
+                log_with_user_info("ERROR", error_msg, user_info, exc_info=True)
+            else:
+                logger.error("%s", error_msg, exc_info=True)
             
             try:
                 if update and update.message:
-                    await update.message.reply_text(
-                        "❌ <b>Internal Error</b>\n\n"
-                        "An unexpected error occurred. The error has been logged and will be investigated.",
-                        parse_mode='HTML'
-                    )
+                    await update.message.reply_text(_INTERNAL_ERROR_HTML, parse_mode='HTML')
             except Exception as nested_e:
-                logger.error(f"❌ Failed to send error message: {str(nested_e)}")
+                logger.error("❌ Failed to send error message: %s", nested_e)
     
     return wrapper
 
-# Supported languages configuration
+# Supported languages configuration. python3 and node read the whole program
+# from stdin before running it; bash reads stdin line by line while running,
+# so it takes the program as an argument instead ('code_arg')
 SUPPORTED_LANGUAGES = {
-    'python': {'ext': '.py', 'cmd': ['python3']},
-    'javascript': {'ext': '.js', 'cmd': ['node']},
-    'bash': {'ext': '.sh', 'cmd': ['bash']},
-    'shell': {'ext': '.sh', 'cmd': ['bash']},
+    'python': {'cmd': ['python3', '-']},
+    'javascript': {'cmd': ['node', '-']},
+    'bash': {'cmd': ['bash', '-c', '--'], 'code_arg': True},
+    'shell': {'cmd': ['bash', '-c', '--'], 'code_arg': True},
 }
 
+def resolve_interpreters() -> None:
+    """Replace interpreter names with absolute paths so each eval skips the PATH search"""
+    for config in SUPPORTED_LANGUAGES.values():
+        resolved = shutil.which(config['cmd'][0])
+        if resolved:
+            config['cmd'][0] = resolved
+        else:
+            logger.warning("⚠️ Interpreter %s not found on PATH", config['cmd'][0])
+
+resolve_interpreters()
+
 # Security restrictions
 FORBIDDEN_PATTERNS = [
     r'import\s+os',
@@ -269,85 +298,137 @@ FORBIDDEN_PATTERNS = [
     r'netcat',
 ]
 
+# Single alternation of all forbidden patterns, one named group per pattern.
+# Matching stays Unicode-aware (no re.ASCII): Python normalizes identifiers,
+# so e.g. "import ſyſ" imports sys and must still be caught by case folding.
+_FORBIDDEN_RE = re.compile(
+    "|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(FORBIDDEN_PATTERNS)),
+    re.IGNORECASE
+)
+_GROUP_TO_PATTERN = {f"p{i}": pattern for i, pattern in enumerate(FORBIDDEN_PATTERNS)}
+
 MAX_EXECUTION_TIME = 10  # seconds
 MAX_OUTPUT_LENGTH = 4000  # characters
+OUTPUT_BYTE_LIMIT = MAX_OUTPUT_LENGTH * 4  # bytes, worst-case UTF-8 width
 MAX_CODE_LENGTH = 10000  # characters
 
-# HTTP SERVER FOR DEPLOYMENT
-class DummyHandler(BaseHTTPRequestHandler):
-    """Simple HTTP handler for keep-alive server"""
+# Upper bound on concurrently running eval subprocesses. Only child processes
+# are gated; handlers keep running and simply wait for a free slot.
+def read_eval_concurrency(default: int = 4) -> int:
+    """Read EVAL_CONCURRENCY from the environment, at least 1 and falling back to default"""
+    raw = os.environ.get("EVAL_CONCURRENCY")
+    if raw is None:
+        return default
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        logger.warning("⚠️ Invalid EVAL_CONCURRENCY %r, using %s", raw, default)
+        return default
 
-    def do_GET(self):
-        try:
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b"Code evaluation bot is alive!")
-        except Exception as e:
-            logger.error(f"❌ HTTP server GET error: {str(e)}")
+EVAL_CONCURRENCY = read_eval_concurrency()
 
-    def do_HEAD(self):
-        try:
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain')
-            self.end_headers()
-        except Exception as e:
-            logger.error(f"❌ HTTP server HEAD error: {str(e)}")
+# Created on first use: on Python < 3.10 a Semaphore binds to the loop that
+# exists when it is built, and main() swaps in uvloop after import
+_EVAL_SEMAPHORE: Optional[asyncio.Semaphore] = None
 
-    def log_message(self, format, *args):
-        # Suppress HTTP server logs
-        pass
+def get_eval_semaphore() -> asyncio.Semaphore:
+    """Return the eval subprocess semaphore, creating it on the running loop"""
+    global _EVAL_SEMAPHORE
+    if _EVAL_SEMAPHORE is None:
+        _EVAL_SEMAPHORE = asyncio.Semaphore(EVAL_CONCURRENCY)
+    return _EVAL_SEMAPHORE
+
+# HTTP SERVER FOR DEPLOYMENT
+_ALIVE_BODY = b"Code evaluation bot is alive!"
+_ALIVE_LENGTH = str(len(_ALIVE_BODY))
 
 def start_dummy_server() -> None:
     """Start dummy HTTP server for deployment platforms"""
     try:
+        # Imported here so runs without a keep-alive server never load it
+        from http.server import (
+            ThreadingHTTPServer,
+            BaseHTTPRequestHandler
+        )
+
+        class DummyHandler(BaseHTTPRequestHandler):
+            """Simple HTTP handler for keep-alive server"""
+
+            def do_GET(self):
+                self.do_HEAD()
+                self.wfile.write(_ALIVE_BODY)
+
+            def do_HEAD(self):
+                # Socket errors are handled by the server's handle_error
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', _ALIVE_LENGTH)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                # Suppress HTTP server logs
+                pass
+
         port = int(os.environ.get("PORT", 10000))
-        server = HTTPServer(("0.0.0.0", port), DummyHandler)
-        logger.info(f"🌐 Dummy server listening on port {port}")
+        server = ThreadingHTTPServer(("0.0.0.0", port), DummyHandler)
+        logger.info("🌐 Dummy server listening on port %s", port)
         server.serve_forever()
     except Exception as e:
-        logger.error(f"❌ Failed to start HTTP server: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("❌ Failed to start HTTP server: %s", e, exc_info=True)
 
 def is_code_safe(code: str) -> Tuple[bool, str]:
     """Check if code contains potentially dangerous patterns"""
     try:
-        if not code or not isinstance(code, str):
+        # Cheap type and length checks reject bad input before any regex work
+        if not isinstance(code, str) or not code:
             return False, "Invalid code input"
         
         if len(code) > MAX_CODE_LENGTH:
             return False, f"Code too long (max {MAX_CODE_LENGTH} characters)"
         
-        for pattern in FORBIDDEN_PATTERNS:
-            try:
-                if re.search(pattern, code, re.IGNORECASE):
-                    logger.warning(f"🚫 Forbidden pattern detected: {pattern}")
-                    return False, f"Forbidden pattern detected: {pattern}"
-            except re.error as e:
-                logger.error(f"❌ Regex error with pattern {pattern}: {str(e)}")
-                continue
+        match = _FORBIDDEN_RE.search(code)
+        if match:
+            pattern = _GROUP_TO_PATTERN[match.lastgroup]
+            logger.warning("🚫 Forbidden pattern detected: %s", pattern)
+            return False, f"Forbidden pattern detected: {pattern}"
         
         return True, ""
     except Exception as e:
-        logger.error(f"❌ Error in security check: {str(e)}")
+        logger.error("❌ Error in security check: %s", e)
         return False, f"Security check failed: {str(e)}"
 
-def cleanup_temp_file(file_path: str) -> None:
-    """Safely cleanup temporary file"""
+async def kill_process_group(pgid: int) -> None:
+    """Kill every process in the group led by an eval subprocess"""
     try:
-        if file_path and os.path.exists(file_path):
-            os.unlink(file_path)
-            logger.debug(f"🗑️ Cleaned up temp file: {file_path}")
-    except OSError as e:
-        logger.warning(f"⚠️ Failed to cleanup temp file {file_path}: {str(e)}")
+        os.killpg(pgid, signal.SIGTERM)
+        logger.debug("🛑 Terminated process group %s", pgid)
+        
+        # Give well-behaved processes a moment to exit before forcing it
+        await asyncio.sleep(0.2)
+        os.killpg(pgid, signal.SIGKILL)
+        logger.debug("💀 Killed process group %s", pgid)
+    except ProcessLookupError:
+        logger.debug("🔍 Process group %s no longer exists", pgid)
     except Exception as e:
-        logger.error(f"❌ Unexpected error cleaning up temp file {file_path}: {str(e)}")
+        logger.error("❌ Error killing process group %s: %s", pgid, e)
 
 async def kill_process_tree(pid: int) -> None:
-    """Kill process and all its children"""
+    """Kill process and all its children (fallback where process groups are unavailable)"""
+    try:
+        import psutil  # Only needed on platforms without os.killpg
+    except ImportError:
+        # Without psutil only the direct child can be reached; on Windows
+        # os.kill with SIGTERM maps to TerminateProcess
+        logger.error("❌ psutil is required to kill the children of process %s on this platform", pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            logger.error("❌ Error killing process %s: %s", pid, e)
+        return
+
     try:
         if not psutil.pid_exists(pid):
-            logger.debug(f"🔍 Process {pid} doesn't exist")
+            logger.debug("🔍 Process %s doesn't exist", pid)
             return
         
         parent = psutil.Process(pid)
@@ -357,11 +438,11 @@ async def kill_process_tree(pid: int) -> None:
         for child in children:
             try:
                 child.terminate()
-                logger.debug(f"🛑 Terminated child process {child.pid}")
+                logger.debug("🛑 Terminated child process %s", child.pid)
             except psutil.NoSuchProcess:
                 pass
             except Exception as e:
-                logger.warning(f"⚠️ Error terminating child process {child.pid}: {str(e)}")
+                logger.warning("⚠️ Error terminating child process %s: %s", child.pid, e)
         
         # Wait for children to terminate
         gone, alive = psutil.wait_procs(children, timeout=3)
@@ -370,42 +451,78 @@ async def kill_process_tree(pid: int) -> None:
         for child in alive:
             try:
                 child.kill()
-                logger.debug(f"💀 Killed stubborn child process {child.pid}")
+                logger.debug("💀 Killed stubborn child process %s", child.pid)
             except psutil.NoSuchProcess:
                 pass
             except Exception as e:
-                logger.warning(f"⚠️ Error killing child process {child.pid}: {str(e)}")
+                logger.warning("⚠️ Error killing child process %s: %s", child.pid, e)
         
         # Terminate parent
         try:
             parent.terminate()
             parent.wait(timeout=3)
-            logger.debug(f"🛑 Terminated parent process {pid}")
+            logger.debug("🛑 Terminated parent process %s", pid)
         except psutil.TimeoutExpired:
             parent.kill()
-            logger.debug(f"💀 Killed parent process {pid}")
+            logger.debug("💀 Killed parent process %s", pid)
         except psutil.NoSuchProcess:
             pass
         except Exception as e:
-            logger.warning(f"⚠️ Error terminating parent process {pid}: {str(e)}")
+            logger.warning("⚠️ Error terminating parent process %s: %s", pid, e)
             
     except psutil.NoSuchProcess:
-        logger.debug(f"🔍 Process {pid} no longer exists")
+        logger.debug("🔍 Process %s no longer exists", pid)
     except Exception as e:
-        logger.error(f"❌ Error killing process tree {pid}: {str(e)}")
+        logger.error("❌ Error killing process tree %s: %s", pid, e)
+
+async def read_capped(stream: asyncio.StreamReader, limit: int) -> bytes:
+    """Read up to limit bytes from stream, then discard the rest until EOF"""
+    data = bytearray()
+    while len(data) < limit:
+        chunk = await stream.read(limit - len(data))
+        if not chunk:
+            return bytes(data)
+        data += chunk
+    
+    # Keep draining so the child never blocks on a full pipe
+    while await stream.read(65536):
+        pass
+    return bytes(data)
+
+async def feed_stdin(process: asyncio.subprocess.Process, program: Optional[bytes]) -> None:
+    """Write the program to the child's stdin and close it"""
+    if program is None:
+        return
+    try:
+        process.stdin.write(program)
+        await process.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The child exited without reading all of its program
+        pass
+    finally:
+        process.stdin.close()
+
+async def communicate_capped(process: asyncio.subprocess.Process, program: Optional[bytes], limit: int) -> Tuple[bytes, bytes]:
+    """Like Process.communicate, but keep at most limit bytes of stdout and stderr"""
+    _, stdout, stderr = await asyncio.gather(
+        feed_stdin(process, program),
+        read_capped(process.stdout, limit),
+        read_capped(process.stderr, limit),
+    )
+    await process.wait()
+    return stdout, stderr
 
 async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
     """Execute code safely with timeout and resource limits"""
-    temp_file_path = None
     process = None
     
     try:
-        logger.info(f"🚀 Starting code execution - Language: {language}")
+        logger.info("🚀 Starting code execution - Language: %s", language)
         
         # Validate language
         if not language or language not in SUPPORTED_LANGUAGES:
             error_msg = f"Unsupported language: {language}. Supported: {', '.join(SUPPORTED_LANGUAGES.keys())}"
-            logger.warning(f"⚠️ {error_msg}")
+            logger.warning("⚠️ %s", error_msg)
             return {
                 'success': False,
                 'output': '',
@@ -415,7 +532,7 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
         # Validate code
         if not code or not isinstance(code, str):
             error_msg = "Invalid code input"
-            logger.warning(f"⚠️ {error_msg}")
+            logger.warning("⚠️ %s", error_msg)
             return {
                 'success': False,
                 'output': '',
@@ -426,7 +543,7 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
         is_safe, reason = is_code_safe(code)
         if not is_safe:
             error_msg = f"Code rejected for security reasons: {reason}"
-            logger.warning(f"🚫 {error_msg}")
+            logger.warning("🚫 %s", error_msg)
             return {
                 'success': False,
                 'output': '',
@@ -434,76 +551,58 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
             }
         
         lang_config = SUPPORTED_LANGUAGES[language]
-        logger.debug(f"🔧 Language config: {lang_config}")
+        logger.debug("🔧 Language config: %s", lang_config)
         
-        # Create temporary file with error handling
+        # Execute code with comprehensive error handling, holding a
+        # subprocess slot until the child has exited or been killed
+        semaphore = get_eval_semaphore()
+        await semaphore.acquire()
         try:
-            with tempfile.NamedTemporaryFile(
-                mode='w', 
-                suffix=lang_config['ext'], 
-                delete=False
-            ) as temp_file:
-                temp_file.write(code)
-                temp_file_path = temp_file.name
+            logger.debug("⚡ Executing: %s", lang_config['cmd'])
             
-            logger.debug(f"📝 Created temp file: {temp_file_path}")
-        except IOError as e:
-            error_msg = f"Failed to create temporary file: {str(e)}"
-            logger.error(f"❌ {error_msg}")
-            return {
-                'success': False,
-                'output': '',
-                'error': error_msg
-            }
-        
-        # Verify temp file was created
-        if not os.path.exists(temp_file_path):
-            error_msg = "Temporary file was not created"
-            logger.error(f"❌ {error_msg}")
-            return {
-                'success': False,
-                'output': '',
-                'error': error_msg
-            }
-        
-        # Execute code with comprehensive error handling
-        try:
-            logger.debug(f"⚡ Executing: {lang_config['cmd'] + [temp_file_path]}")
+            if lang_config.get('code_arg'):
+                argv = [*lang_config['cmd'], code]
+                stdin, program = asyncio.subprocess.DEVNULL, None
+            else:
+                argv = lang_config['cmd']
+                stdin, program = asyncio.subprocess.PIPE, code.encode('utf-8')
             
             process = await asyncio.create_subprocess_exec(
-                *lang_config['cmd'], temp_file_path,
+                *argv,
+                stdin=stdin,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                limit=1024*1024,  # 1MB limit for stdout/stderr
                 preexec_fn=os.setsid if hasattr(os, 'setsid') else None  # Create process group on Unix
             )
             
-            logger.debug(f"🔄 Process started with PID: {process.pid}")
+            logger.debug("🔄 Process started with PID: %s", process.pid)
             
             try:
                 # Wait for process completion with timeout
                 stdout, stderr = await asyncio.wait_for(
-                    process.communicate(), 
+                    communicate_capped(process, program, OUTPUT_BYTE_LIMIT + 1),
                     timeout=MAX_EXECUTION_TIME
                 )
                 
-                logger.debug(f"✅ Process completed with return code: {process.returncode}")
+                logger.debug("✅ Process completed with return code: %s", process.returncode)
                 
-                # Decode output with error handling
+                # Decode output with error handling. Only the first
+                # OUTPUT_BYTE_LIMIT bytes can survive truncation, so the rest
+                # is never decoded.
                 try:
-                    stdout_str = stdout.decode('utf-8', errors='replace')
-                    stderr_str = stderr.decode('utf-8', errors='replace')
+                    stdout_str = stdout[:OUTPUT_BYTE_LIMIT].decode('utf-8', errors='replace')
+                    stderr_str = stderr[:OUTPUT_BYTE_LIMIT].decode('utf-8', errors='replace')
                 except UnicodeDecodeError as e:
-                    logger.warning(f"⚠️ Unicode decode error: {str(e)}")
-                    stdout_str = str(stdout)
-                    stderr_str = str(stderr)
+                    logger.warning("⚠️ Unicode decode error: %s", e)
+                    stdout_str = str(stdout[:OUTPUT_BYTE_LIMIT])
+                    stderr_str = str(stderr[:OUTPUT_BYTE_LIMIT])
                 
                 # Truncate output if too long
-                if len(stdout_str) > MAX_OUTPUT_LENGTH:
+                if len(stdout_str) > MAX_OUTPUT_LENGTH or len(stdout) > OUTPUT_BYTE_LIMIT:
                     stdout_str = stdout_str[:MAX_OUTPUT_LENGTH] + "\n... (output truncated)"
                     logger.debug("✂️ Output truncated due to length")
                 
-                if len(stderr_str) > MAX_OUTPUT_LENGTH:
+                if len(stderr_str) > MAX_OUTPUT_LENGTH or len(stderr) > OUTPUT_BYTE_LIMIT:
                     stderr_str = stderr_str[:MAX_OUTPUT_LENGTH] + "\n... (error output truncated)"
                     logger.debug("✂️ Error output truncated due to length")
                 
@@ -518,21 +617,25 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
                 }
                 
                 status = "✅ SUCCESS" if success else "❌ FAILED"
-                logger.info(f"{status} - Return code: {process.returncode}")
+                logger.info("%s - Return code: %s", status, process.returncode)
                 
                 return result
                 
             except asyncio.TimeoutError:
-                logger.warning(f"⏰ Execution timeout after {MAX_EXECUTION_TIME} seconds")
+                logger.warning("⏰ Execution timeout after %s seconds", MAX_EXECUTION_TIME)
                 
-                # Kill the process tree
+                # Kill the process tree. The child was started with setsid,
+                # so its pid is also the id of the group holding all its children.
                 if process and process.pid:
-                    await kill_process_tree(process.pid)
+                    if hasattr(os, 'killpg'):
+                        await kill_process_group(process.pid)
+                    else:
+                        await kill_process_tree(process.pid)
                 
                 try:
                     await process.wait()
                 except Exception as e:
-                    logger.warning(f"⚠️ Error waiting for process after timeout: {str(e)}")
+                    logger.warning("⚠️ Error waiting for process after timeout: %s", e)
                 
                 return {
                     'success': False,
@@ -542,7 +645,7 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
             
         except FileNotFoundError as e:
             error_msg = f"Command not found: {lang_config['cmd'][0]}. Please ensure the interpreter is installed."
-            logger.error(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return {
                 'success': False,
                 'output': '',
@@ -550,7 +653,7 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
             }
         except PermissionError as e:
             error_msg = f"Permission denied executing code: {str(e)}"
-            logger.error(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return {
                 'success': False,
                 'output': '',
@@ -558,7 +661,7 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
             }
         except OSError as e:
             error_msg = f"OS error during execution: {str(e)}"
-            logger.error(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return {
                 'success': False,
                 'output': '',
@@ -566,34 +669,39 @@ async def execute_code(code: str, language: str = 'python') -> Dict[str, Any]:
             }
         except Exception as e:
             error_msg = f"Unexpected error during execution: {str(e)}"
-            logger.error(f"❌ {error_msg}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.error("❌ %s", error_msg, exc_info=True)
             return {
                 'success': False,
                 'output': '',
                 'error': error_msg
             }
+        finally:
+            semaphore.release()
             
     except Exception as e:
         error_msg = f"Fatal error in code execution: {str(e)}"
-        logger.error(f"💥 {error_msg}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("💥 %s", error_msg, exc_info=True)
         return {
             'success': False,
             'output': '',
             'error': error_msg
         }
-    finally:
-        # Always cleanup temp file
-        if temp_file_path:
-            cleanup_temp_file(temp_file_path)
 
-@error_handler_decorator
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /start command"""
-    logger.info("🎯 Processing /start command")
-    
-    welcome_message = """🤖 <b>Code Evaluation Bot</b>
+# STATIC BOT MESSAGES
+# Usage and error replies
+_EVAL_USAGE_HTML = "❌ <b>Usage:</b> <code>/eval &lt;language&gt; &lt;code&gt;</code>\n\n<b>Example:</b> <code>/eval python print('Hello, World!')</code>\nUse <code>/langs</code> to see supported languages."
+_EVAL_MISSING_ARGS_HTML = "❌ Please provide both language and code.\n\n<b>Usage:</b> <code>/eval &lt;language&gt; &lt;code&gt;</code>"
+_EVAL_MESSAGE_USAGE_HTML = "❌ <b>Usage:</b> <code>?eval &lt;language&gt; &lt;code&gt;</code> or <code>!eval &lt;language&gt; &lt;code&gt;</code>\n\n<b>Example:</b> <code>?eval python print('Hello, World!')</code>\nUse <code>/langs</code> to see supported languages."
+_EVAL_MESSAGE_MISSING_ARGS_HTML = "❌ Please provide both language and code.\n\n<b>Usage:</b> <code>?eval &lt;language&gt; &lt;code&gt;</code> or <code>!eval &lt;language&gt; &lt;code&gt;</code>"
+_NO_CODE_HTML = "❌ No code provided to execute."
+_TELEGRAM_API_ERROR_HTML = "❌ <b>Telegram API Error</b>\n\nThere was an issue communicating with Telegram. Please try again later."
+_INTERNAL_ERROR_HTML = "❌ <b>Internal Error</b>\n\nAn unexpected error occurred. The error has been logged and will be investigated."
+_NETWORK_ERROR_HTML = "❌ <b>Network Error</b>\n\nThere was a network connectivity issue. Please try again."
+_TIMEOUT_ERROR_HTML = "❌ <b>Timeout Error</b>\n\nThe request timed out. Please try again."
+_BAD_REQUEST_HTML = "❌ <b>Invalid Request</b>\n\nThe request was invalid. Please check your input."
+_UNEXPECTED_ERROR_HTML = "❌ <b>Unexpected Error</b>\n\nAn unexpected error occurred. The error has been logged."
+
+_WELCOME_HTML = """🤖 <b>Code Evaluation Bot</b>
 
 Welcome! I can safely execute code in multiple languages with built-in security measures.
 
@@ -603,32 +711,8 @@ Welcome! I can safely execute code in multiple languages with built-in security
 • <code>!eval bash echo "Test"</code>
 
 ⚠️ <b>Secure execution with 10s timeout & output limits</b>"""
-    
-    # Create inline keyboard
-    keyboard = [
-        [
-            InlineKeyboardButton("📢 Updates", url=UPDATES_CHANNEL),
-            InlineKeyboardButton("💬 Support", url=SUPPORT_GROUP)
-        ],
-        [
-            InlineKeyboardButton("➕ Add Me To Your Group", 
-                               url=f"https://t.me/{BOT_USERNAME}?startgroup=true")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        welcome_message, 
-        parse_mode='HTML', 
-        reply_markup=reply_markup
-    )
 
-@error_handler_decorator
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /help command"""
-    logger.info("🎯 Processing /help command")
-    
-    short_help = """🤖 <b>Code Evaluation Bot - Quick Help</b>
+_SHORT_HELP_HTML = """🤖 <b>Code Evaluation Bot - Quick Help</b>
 
 <b>Usage:</b> <code>/eval &lt;lang&gt; &lt;code&gt;</code> or <code>?eval &lt;lang&gt; &lt;code&gt;</code>
 
@@ -639,26 +723,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 <code>?eval js console.log("Hi!")</code>
 
 <b>Security:</b> 10s timeout, output limits, no dangerous operations allowed."""
-    
-    # Create expand/minimize button
-    keyboard = [[
-        InlineKeyboardButton("📖 Expand Help", callback_data="help_expand")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        short_help, 
-        parse_mode='HTML', 
-        reply_markup=reply_markup
-    )
 
-async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle help expand/minimize callbacks"""
-    query = update.callback_query
-    await query.answer()
-    
-    if query.data == "help_expand":
-        expanded_help = """🤖 <b>Code Evaluation Bot - Detailed Help</b>
+_EXPANDED_HELP_HTML = """🤖 <b>Code Evaluation Bot - Detailed Help</b>
 
 <b>Commands:</b> /eval, ?eval, !eval &lt;language&gt; &lt;code&gt;
 
@@ -673,41 +739,8 @@ for i in range(3):
     print(f"Number: {i}")</code>
 
 <b>Security & Limits:</b> 10s execution timeout, 4KB output limit, forbidden: file access, network, system commands."""
-        
-        keyboard = [[
-            InlineKeyboardButton("📄 Minimize Help", callback_data="help_minimize")
-        ]]
-    else:  # help_minimize
-        expanded_help = """🤖 <b>Code Evaluation Bot - Quick Help</b>
-
-<b>Usage:</b> <code>/eval &lt;lang&gt; &lt;code&gt;</code> or <code>?eval &lt;lang&gt; &lt;code&gt;</code>
 
-<b>Languages:</b> python, javascript, bash/shell
-
-<b>Examples:</b>
-<code>/eval python print("Hello!")</code>
-<code>?eval js console.log("Hi!")</code>
-
-<b>Security:</b> 10s timeout, output limits, no dangerous operations allowed."""
-        
-        keyboard = [[
-            InlineKeyboardButton("📖 Expand Help", callback_data="help_expand")
-        ]]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(
-        text=expanded_help,
-        parse_mode='HTML',
-        reply_markup=reply_markup
-    )
-
-@error_handler_decorator
-async def langs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /langs command"""
-    logger.info("🎯 Processing /langs command")
-    
-    langs_message = """<b>Supported Languages:</b>
+_LANGS_HTML = """<b>Supported Languages:</b>
 
 🐍 <b>Python</b> (<code>python</code>)
 - Python 3 interpreter
@@ -732,8 +765,70 @@ async def langs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
   <code>!eval bash echo "Hello!"</code>
 
 ⚠️ <b>Security restrictions apply to all languages</b>"""
+
+# Inline keyboards are immutable, so they are built once and reused
+_START_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📢 Updates", url=UPDATES_CHANNEL),
+        InlineKeyboardButton("💬 Support", url=SUPPORT_GROUP)
+    ],
+    [
+        InlineKeyboardButton("➕ Add Me To Your Group", url=ADD_TO_GROUP_URL)
+    ]
+])
+_HELP_EXPAND_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("📖 Expand Help", callback_data="help_expand")
+]])
+_HELP_MINIMIZE_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("📄 Minimize Help", callback_data="help_minimize")
+]])
+
+@error_handler_decorator
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /start command"""
+    logger.info("🎯 Processing /start command")
     
-    await update.message.reply_text(langs_message, parse_mode='HTML')
+    await update.message.reply_text(
+        _WELCOME_HTML, 
+        parse_mode='HTML', 
+        reply_markup=_START_MARKUP
+    )
+
+@error_handler_decorator
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /help command"""
+    logger.info("🎯 Processing /help command")
+    
+    await update.message.reply_text(
+        _SHORT_HELP_HTML, 
+        parse_mode='HTML', 
+        reply_markup=_HELP_EXPAND_MARKUP
+    )
+
+async def help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle help expand/minimize callbacks"""
+    query = update.callback_query
+    await query.answer()
+    
+    if query.data == "help_expand":
+        help_text, reply_markup = _EXPANDED_HELP_HTML, _HELP_MINIMIZE_MARKUP
+    else:  # help_minimize
+        help_text, reply_markup = _SHORT_HELP_HTML, _HELP_EXPAND_MARKUP
+    
+    await query.edit_message_text(
+        text=help_text,
+        parse_mode='HTML',
+        reply_markup=reply_markup
+    )
+
+@error_handler_decorator
+async def langs_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /langs command"""
+    logger.info("🎯 Processing /langs command")
+    
+    await update.message.reply_text(_LANGS_HTML, parse_mode='HTML')
+
+_GROUP_CHAT_TYPES = frozenset({'group', 'supergroup'})
 
 @error_handler_decorator
 async def ping_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -743,7 +838,7 @@ async def ping_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     start_time = time.time()
     
     # Determine if we're in a group or private chat
-    is_group = update.effective_chat.type in ['group', 'supergroup']
+    is_group = update.effective_chat.type in _GROUP_CHAT_TYPES
     
     # Send initial ping message
     if is_group:
@@ -763,10 +858,8 @@ async def ping_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Edit message with pong response and hyperlink
     pong_text = f'🏓 <a href="https://t.me/SoulMeetsHQ">Pong!</a> {ping_time}ms'
     
-    await context.bot.edit_message_text(
-        chat_id=ping_message.chat.id,
-        message_id=ping_message.message_id,
-        text=pong_text,
+    await ping_message.edit_text(
+        pong_text,
         parse_mode='HTML',
         disable_web_page_preview=True
     )
@@ -775,43 +868,105 @@ def validate_eval_args(args: list, message_text: str) -> Tuple[bool, Optional[st
     """Validate and parse eval command arguments"""
     try:
         if not args:
-            return False, None, None, "❌ <b>Usage:</b> <code>/eval &lt;language&gt; &lt;code&gt;</code>\n\n<b>Example:</b> <code>/eval python print('Hello, World!')</code>\nUse <code>/langs</code> to see supported languages."
+            return False, None, None, _EVAL_USAGE_HTML
         
         # Parse language and code
         if len(args) < 2:
-            return False, None, None, "❌ Please provide both language and code.\n\n<b>Usage:</b> <code>/eval &lt;language&gt; &lt;code&gt;</code>"
+            return False, None, None, _EVAL_MISSING_ARGS_HTML
         
-        language = args[0].lower()
-        code = ' '.join(args[1:])
+        # Parse the message text once: "/eval <language> [code]" on the first
+        # line, with multiline code following it
+        nl = message_text.find('\n')
+        header = message_text if nl == -1 else message_text[:nl]
+        parts = header.split(None, 2)
         
-        # Handle multiline code (from message text)
-        if '\n' in message_text:
-            lines = message_text.split('\n')
-            if len(lines) > 1:
-                # Extract code from multiline message
-                first_line_parts = lines[0].split()
-                if len(first_line_parts) >= 2:
-                    language = first_line_parts[1].lower()
-                    code = '\n'.join(lines[1:])
+        if len(parts) < 2:
+            # Language is not on the command line itself, use the split args
+            language = args[0].lower()
+            code = ' '.join(args[1:])
+        else:
+            language = parts[1].lower()
+            code = message_text[nl + 1:] if nl != -1 else ''
+            if not code and len(parts) > 2:
+                code = parts[2]
         
         if not code.strip():
-            return False, None, None, "❌ No code provided to execute."
+            return False, None, None, _NO_CODE_HTML
         
         return True, language, code, ""
     except Exception as e:
-        logger.error(f"❌ Error validating eval args: {str(e)}")
+        logger.error("❌ Error validating eval args: %s", e)
         return False, None, None, f"❌ Error parsing command arguments: {str(e)}"
 
+# Translation table for the entities Telegram's HTML parse mode requires
+_HTML_TRANS = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
 def escape_html(text: str) -> str:
     """Escape HTML entities in text"""
     try:
         if not text or not isinstance(text, str):
             return ""
-        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        return text.translate(_HTML_TRANS)
     except Exception as e:
-        logger.error(f"❌ Error escaping HTML: {str(e)}")
+        logger.error("❌ Error escaping HTML: %s", e)
         return str(text)
 
+# Short outputs (empty results, greetings, common error banners) repeat a lot;
+# longer ones are escaped directly so the cache stays small
+ESCAPE_CACHE_MAX_LENGTH = 512
+
+@lru_cache(maxsize=1024)
+def _escape_html_short(text: str) -> str:
+    return escape_html(text)
+
+def escape_output_html(text: str) -> str:
+    """Escape HTML in execution output, memoizing short strings"""
+    if isinstance(text, str) and len(text) <= ESCAPE_CACHE_MAX_LENGTH:
+        return _escape_html_short(text)
+    return escape_html(text)
+
+# Reply templates for execution results; {rc} holds the optional return-code line
+_OK_TMPL = "✅ <b>Execution successful ({lang})</b>\n\n<b>Output:</b>\n<pre>{out}</pre>{rc}"
+_OK_NOOUT_TMPL = "✅ <b>Execution successful ({lang})</b>\n\n<i>(No output)</i>{rc}"
+_FAIL_TMPL = "❌ <b>Execution failed ({lang})</b>\n\n<b>Error:</b>\n<pre>{out}</pre>{rc}"
+_FAIL_NOOUT_TMPL = "❌ <b>Execution failed ({lang})</b>\n\n{rc}"
+_RC_TMPL = "\n\n<b>Return code:</b> <code>{}</code>"
+
+def format_execution_result(language: str, result: Dict[str, Any]) -> str:
+    """Render an execute_code result as an HTML reply"""
+    if result['success']:
+        body = result['output']
+        template = _OK_TMPL if body else _OK_NOOUT_TMPL
+    else:
+        body = result['error']
+        template = _FAIL_TMPL if body else _FAIL_NOOUT_TMPL
+    
+    rc = _RC_TMPL.format(result['return_code']) if 'return_code' in result else ""
+    return template.format(
+        lang=escape_html(language),
+        out=escape_output_html(body) if body else "",
+        rc=rc
+    )
+
+# Strong references to fire-and-forget tasks so they are not collected mid-flight
+_BACKGROUND_TASKS = set()
+
+async def send_typing_action(bot, chat_id: int) -> None:
+    """Send the "typing" chat action, logging instead of raising on failure"""
+    try:
+        await bot.send_chat_action(chat_id=chat_id, action='typing')
+    except Exception as e:
+        logger.warning("⚠️ Failed to send typing action: %s", e)
+
+def start_typing_action(bot, chat_id: int) -> "asyncio.Task[None]":
+    """Send the "typing" chat action in the background, without delaying execution"""
+    task = asyncio.create_task(send_typing_action(bot, chat_id))
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+    # Callers await this before replying, so the action never lands after
+    # the reply and leaves "typing..." showing
+    return task
+
 @error_handler_decorator
 async def eval_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /eval command"""
@@ -830,101 +985,72 @@ async def eval_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     log_with_user_info("INFO", f"📝 Code execution requested - Language: {language}", user_info)
     
-    # Show "typing" status
-    try:
-        await context.bot.send_chat_action(
-            chat_id=update.effective_chat.id, 
-            action='typing'
-        )
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to send typing action: {str(e)}")
+    # Show "typing" status while the code runs
+    typing = start_typing_action(context.bot, update.effective_chat.id)
     
     try:
         # Execute code
         result = await execute_code(code, language)
         
-        # Format response
-        if result['success']:
-            response = f"✅ <b>Execution successful ({language})</b>\n\n"
-            if result['output']:
-                escaped_output = escape_html(result['output'])
-                response += f"<b>Output:</b>\n<pre>{escaped_output}</pre>"
-            else:
-                response += "<i>(No output)</i>"
-        else:
-            response = f"❌ <b>Execution failed ({language})</b>\n\n"
-            if result['error']:
-                escaped_error = escape_html(result['error'])
-                response += f"<b>Error:</b>\n<pre>{escaped_error}</pre>"
-        
-        # Add execution info
-        if 'return_code' in result:
-            response += f"\n\n<b>Return code:</b> <code>{result['return_code']}</code>"
+        response = format_execution_result(language, result)
         
         log_with_user_info("INFO", f"✅ Code execution completed - Success: {result['success']}", user_info)
+        await typing
         await update.message.reply_text(response, parse_mode='HTML')
         
     except Exception as e:
         error_msg = f"Internal error during code execution: {str(e)}"
-        logger.error(f"❌ {error_msg}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("❌ %s", error_msg, exc_info=True)
         log_with_user_info("ERROR", error_msg, user_info)
         
-        escaped_error = escape_html(str(e))
+        escaped_error = escape_output_html(str(e))
         await update.message.reply_text(
             f"❌ <b>Internal error occurred:</b>\n<pre>{escaped_error}</pre>",
             parse_mode='HTML'
         )
 
+# "?eval <language> <code>" / "!ping": group 1 is set for ping, group 2 is
+# the language and group 3 the verbatim code, inline or on following lines
+_EVAL_MESSAGE_RE = re.compile(r'^[?!](?:(ping)|eval)\b\s*(\S*)[ \t]*\n?([\s\S]*)')
+
 def parse_eval_message(message_text: str) -> Tuple[bool, Optional[str], Optional[str], str]:
     """Parse ?eval, !eval, ?ping, or !ping messages"""
     try:
         if not message_text or not isinstance(message_text, str):
             return False, None, None, "Invalid message"
         
-        # Check if message starts with ?ping or !ping
-        if message_text.startswith('?ping') or message_text.startswith('!ping'):
-            return True, "ping", None, ""
-        
-        # Check if message starts with ?eval or !eval
-        if not (message_text.startswith('?eval') or message_text.startswith('!eval')):
+        match = _EVAL_MESSAGE_RE.match(message_text)
+        if not match:
             return False, None, None, "Not an eval message"
         
-        # Remove the prefix and process like /eval command
-        content = message_text[5:].strip()  # Remove '?eval' or '!eval'
-        
-        if not content:
-            return False, None, None, "❌ <b>Usage:</b> <code>?eval &lt;language&gt; &lt;code&gt;</code> or <code>!eval &lt;language&gt; &lt;code&gt;</code>\n\n<b>Example:</b> <code>?eval python print('Hello, World!')</code>\nUse <code>/langs</code> to see supported languages."
-        
-        # Parse language and code from content
-        parts = content.split()
-        if len(parts) < 2:
-            return False, None, None, "❌ Please provide both language and code.\n\n<b>Usage:</b> <code>?eval &lt;language&gt; &lt;code&gt;</code> or <code>!eval &lt;language&gt; &lt;code&gt;</code>"
-        
-        language = parts[0].lower()
-        code = ' '.join(parts[1:])
+        if match.group(1):
+            return True, "ping", None, ""
         
-        # Handle multiline code
-        if '\n' in message_text:
-            lines = message_text.split('\n')
-            if len(lines) > 1:
-                # Extract code from multiline message
-                first_line_parts = lines[0].split()
-                if len(first_line_parts) >= 2:
-                    language = first_line_parts[1].lower()
-                    code = '\n'.join(lines[1:])
+        language, code = match.group(2, 3)
+        if not language:
+            return False, None, None, _EVAL_MESSAGE_USAGE_HTML
         
         if not code.strip():
-            return False, None, None, "❌ No code provided to execute."
+            return False, None, None, _EVAL_MESSAGE_MISSING_ARGS_HTML
         
-        return True, language, code, ""
+        return True, language.lower(), code, ""
     except Exception as e:
-        logger.error(f"❌ Error parsing eval message: {str(e)}")
+        logger.error("❌ Error parsing eval message: %s", e)
         return False, None, None, f"Error parsing message: {str(e)}"
 
-@error_handler_decorator
 async def handle_eval_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle messages that start with ?eval, !eval, ?ping, or !ping"""
+    # This runs for every text message in every chat. Reject unrelated text on
+    # its first character, before the decorator extracts and logs user info.
+    text = update.message.text if update.message else None
+    if not text or (text[0] != '?' and text[0] != '!'):
+        return
+    
+    await process_eval_message(update, context)
+
+@error_handler_decorator
+async def process_eval_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Parse and run a message that passed the ?/! prefix check"""
     user_info = extract_user_info(update.message)
     message_text = update.message.text or ""
     
@@ -950,150 +1076,224 @@ async def handle_eval_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         language = command_or_language
         log_with_user_info("INFO", f"📝 Eval message received - Language: {language}", user_info)
         
-        # Show "typing" status
-        try:
-            await context.bot.send_chat_action(
-                chat_id=update.effective_chat.id, 
-                action='typing'
-            )
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to send typing action: {str(e)}")
+        # Show "typing" status while the code runs
+        typing = start_typing_action(context.bot, update.effective_chat.id)
         
         # Execute code
         result = await execute_code(code, language)
         
-        # Format response
-        if result['success']:
-            response = f"✅ <b>Execution successful ({language})</b>\n\n"
-            if result['output']:
-                escaped_output = escape_html(result['output'])
-                response += f"<b>Output:</b>\n<pre>{escaped_output}</pre>"
-            else:
-                response += "<i>(No output)</i>"
-        else:
-            response = f"❌ <b>Execution failed ({language})</b>\n\n"
-            if result['error']:
-                escaped_error = escape_html(result['error'])
-                response += f"<b>Error:</b>\n<pre>{escaped_error}</pre>"
-        
-        # Add execution info
-        if 'return_code' in result:
-            response += f"\n\n<b>Return code:</b> <code>{result['return_code']}</code>"
+        response = format_execution_result(language, result)
         
         log_with_user_info("INFO", f"✅ Eval message execution completed - Success: {result['success']}", user_info)
+        await typing
         await update.message.reply_text(response, parse_mode='HTML')
         
     except Exception as e:
         error_msg = f"Error handling eval message: {str(e)}"
-        logger.error(f"❌ {error_msg}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("❌ %s", error_msg, exc_info=True)
         log_with_user_info("ERROR", error_msg, user_info)
         
-        escaped_error = escape_html(str(e))
+        escaped_error = escape_output_html(str(e))
         await update.message.reply_text(
             f"❌ <b>Internal error occurred:</b>\n<pre>{escaped_error}</pre>",
             parse_mode='HTML'
         )
 
+# Commands menu, registered with Telegram only when it changes
+_COMMANDS = (
+    BotCommand("start", "Welcome message and bot introduction"),
+    BotCommand("help", "Show detailed help and usage examples"),
+    BotCommand("eval", "Execute code in supported languages"),
+    BotCommand("langs", "Show all supported programming languages"),
+    BotCommand("ping", "Check bot response time"),
+)
+COMMANDS_HASH_PATH = os.path.join(tempfile.gettempdir(), "eval_bot_cmds.hash")
+
+def bot_commands_hash(bot_id: int) -> str:
+    """Fingerprint the commands menu for a given bot"""
+    payload = repr((bot_id, [(c.command, c.description) for c in _COMMANDS]))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+def load_commands_hash() -> Optional[str]:
+    """Load the fingerprint of the last registered commands menu"""
+    try:
+        with open(COMMANDS_HASH_PATH, encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def save_commands_hash(commands_hash: str) -> None:
+    """Remember the registered commands menu for the next boot"""
+    try:
+        with open(COMMANDS_HASH_PATH, 'w', encoding='utf-8') as f:
+            f.write(commands_hash)
+    except OSError as e:
+        logger.debug("⚠️ Could not write commands hash %s: %s", COMMANDS_HASH_PATH, e)
+
 async def post_init(application):
     """Post initialization - setup bot commands menu"""
     try:
         logger.info("🚀 Setting up bot commands menu")
         
-        commands = [
-            BotCommand("start", "Welcome message and bot introduction"),
-            BotCommand("help", "Show detailed help and usage examples"),
-            BotCommand("eval", "Execute code in supported languages"),
-            BotCommand("langs", "Show all supported programming languages"),
-            BotCommand("ping", "Check bot response time"),
-        ]
-        
-        await application.bot.set_my_commands(commands)
-        logger.info("✅ Bot commands menu setup completed")
+        commands_hash = bot_commands_hash(application.bot.id)
+        if load_commands_hash() == commands_hash:
+            logger.info("✅ Bot commands menu unchanged, skipping registration")
+        else:
+            await application.bot.set_my_commands(_COMMANDS)
+            save_commands_hash(commands_hash)
+            logger.info("✅ Bot commands menu setup completed")
         
         # Log bot info
         try:
             bot_info = await application.bot.get_me()
-            logger.info(f"🤖 Bot info: @{bot_info.username} ({bot_info.first_name}) - ID: {bot_info.id}")
+            logger.info("🤖 Bot info: @%s (%s) - ID: %s", bot_info.username, bot_info.first_name, bot_info.id)
         except Exception as e:
-            logger.warning(f"⚠️ Could not get bot info: {str(e)}")
+            logger.warning("⚠️ Could not get bot info: %s", e)
             
     except Exception as e:
-        logger.error(f"❌ Error in post_init: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("❌ Error in post_init: %s", e, exc_info=True)
+
+# Log line and user reply per error class, most specific first via the MRO
+_ERROR_RESPONSES = {
+    TimedOut: ("⏰ Request timed out: %s", _TIMEOUT_ERROR_HTML),
+    BadRequest: ("📝 Bad request: %s", _BAD_REQUEST_HTML),
+    NetworkError: ("🌐 Network error occurred: %s", _NETWORK_ERROR_HTML),
+}
 
 async def global_error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
     """Global error handler for the application"""
     try:
         error = context.error
-        logger.error(f"🔥 Global error handler triggered: {str(error)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("🔥 Global error handler triggered: %s", error, exc_info=error)
         
         # Extract user info if available
-        user_info = None
-        if isinstance(update, Update) and update.message:
+        message = update.message if isinstance(update, Update) else None
+        if message:
             try:
-                user_info = extract_user_info(update.message)
+                user_info = extract_user_info(message)
                 log_with_user_info("ERROR", f"Global error: {str(error)}", user_info)
             except Exception as e:
-                logger.error(f"❌ Error extracting user info in error handler: {str(e)}")
-        
-        # Handle specific error types
-        if isinstance(error, NetworkError):
-            logger.error("🌐 Network error occurred")
-            if isinstance(update, Update) and update.message:
-                try:
-                    await update.message.reply_text(
-                        "❌ <b>Network Error</b>\n\nThere was a network connectivity issue. Please try again.",
-                        parse_mode='HTML'
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Failed to send network error message: {str(e)}")
-        
-        elif isinstance(error, TimedOut):
-            logger.error("⏰ Request timed out")
-            if isinstance(update, Update) and update.message:
-                try:
-                    await update.message.reply_text(
-                        "❌ <b>Timeout Error</b>\n\nThe request timed out. Please try again.",
-                        parse_mode='HTML'
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Failed to send timeout error message: {str(e)}")
+                logger.error("❌ Error extracting user info in error handler: %s", e)
         
-        elif isinstance(error, BadRequest):
-            logger.error(f"📝 Bad request: {str(error)}")
-            if isinstance(update, Update) and update.message:
-                try:
-                    await update.message.reply_text(
-                        "❌ <b>Invalid Request</b>\n\nThe request was invalid. Please check your input.",
-                        parse_mode='HTML'
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Failed to send bad request error message: {str(e)}")
-        
-        elif isinstance(error, Forbidden):
-            logger.error(f"🚫 Forbidden: {str(error)}")
+        if isinstance(error, Forbidden):
             # Don't try to send a message if we're forbidden
+            logger.error("🚫 Forbidden: %s", error)
+            return
+        if isinstance(error, ChatMigrated):
+            logger.error("🔄 Chat migrated: %s", error.new_chat_id)
+            return
         
-        elif isinstance(error, ChatMigrated):
-            logger.error(f"🔄 Chat migrated: {error.new_chat_id}")
-            # Handle chat migration if needed
-        
+        entry = next(
+            (_ERROR_RESPONSES[cls] for cls in type(error).__mro__ if cls in _ERROR_RESPONSES),
+            None,
+        )
+        if entry is None:
+            logger.error("❓ Unhandled error type: %s", type(error).__name__)
+            html = _UNEXPECTED_ERROR_HTML
         else:
-            logger.error(f"❓ Unhandled error type: {type(error).__name__}")
-            if isinstance(update, Update) and update.message:
-                try:
-                    await update.message.reply_text(
-                        "❌ <b>Unexpected Error</b>\n\nAn unexpected error occurred. The error has been logged.",
-                        parse_mode='HTML'
-                    )
-                except Exception as e:
-                    logger.error(f"❌ Failed to send generic error message: {str(e)}")
+            log_msg, html = entry
+            logger.error(log_msg, error)
+        if message:
+            try:
+                await message.reply_text(html, parse_mode='HTML')
+            except Exception:
+                logger.exception("❌ Failed to send error message")
     
-    except Exception as e:
-        logger.error(f"💥 Fatal error in global error handler: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+    except Exception:
+        logger.exception("💥 Fatal error in global error handler")
+
+# Interpreter probe results from earlier boots, keyed by command
+ENV_CACHE_PATH = os.path.join(tempfile.gettempdir(), "eval_bot_envcache.json")
+
+def interpreter_cache_key(cmd: str) -> Optional[list]:
+    """Identify an interpreter binary by path, modification time and size"""
+    try:
+        path = shutil.which(cmd)
+        if not path:
+            return None
+        st = os.stat(path)
+        return [path, st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+def load_env_cache() -> Dict[str, Any]:
+    """Load cached interpreter probes, or an empty cache if unreadable"""
+    try:
+        with open(ENV_CACHE_PATH, encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_env_cache(cache: Dict[str, Any]) -> None:
+    """Persist interpreter probes for the next boot"""
+    try:
+        with open(ENV_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError as e:
+        logger.debug("⚠️ Could not write environment cache %s: %s", ENV_CACHE_PATH, e)
+
+def cached_probe(entry: Any, key: Optional[list]) -> Optional[Tuple[int, str]]:
+    """Return a cached (returncode, version) for this binary, or None on a miss or malformed entry"""
+    if key is None or not isinstance(entry, dict) or entry.get('key') != key:
+        return None
+    returncode, version = entry.get('returncode'), entry.get('version')
+    if type(returncode) is not int or not isinstance(version, str):
+        return None
+    return returncode, version
+
+def probe_interpreter_versions() -> Dict[str, Any]:
+    """Map each interpreter command to its `--version` (returncode, output) or error, reusing cached probes"""
+    cache = load_env_cache()
+    results = {}
+    pending = {}
+    
+    for config in SUPPORTED_LANGUAGES.values():
+        cmd = config['cmd'][0]
+        if cmd in results or cmd in pending:
+            continue
+        key = interpreter_cache_key(cmd)
+        cached = cached_probe(cache.get(cmd), key)
+        if cached is not None:
+            logger.debug("✅ Using cached version probe for %s", cmd)
+            results[cmd] = cached
+        else:
+            pending[cmd] = key
+    
+    if not pending:
+        return results
+    
+    # Probe the remaining interpreters concurrently
+    with ThreadPoolExecutor(max_workers=min(16, len(pending))) as executor:
+        futures = {
+            executor.submit(
+                subprocess.run,
+                [cmd, '--version'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            ): cmd
+            for cmd in pending
+        }
+        for future in as_completed(futures):
+            cmd = futures[future]
+            try:
+                result = future.result()
+            except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError) as e:
+                results[cmd] = e
+                continue
+            
+            version_info = result.stdout.strip() or result.stderr.strip()
+            results[cmd] = (result.returncode, version_info)
+            if pending[cmd] is not None:
+                cache[cmd] = {
+                    'key': pending[cmd],
+                    'returncode': result.returncode,
+                    'version': version_info
+                }
+    
+    save_env_cache(cache)
+    return results
 
 def validate_environment() -> bool:
     """Validate that required dependencies are available"""
@@ -1103,45 +1303,43 @@ def validate_environment() -> bool:
         # Check Python version
         python_version = sys.version_info
         if python_version < (3, 7):
-            logger.error(f"❌ Python 3.7+ required, found {python_version.major}.{python_version.minor}")
+            logger.error("❌ Python 3.7+ required, found %s.%s", python_version.major, python_version.minor)
             return False
         else:
-            logger.info(f"✅ Python version: {python_version.major}.{python_version.minor}.{python_version.micro}")
+            logger.info("✅ Python version: %s.%s.%s", python_version.major, python_version.minor, python_version.micro)
         
-        # Check required modules
-        required_modules = ['telegram', 'psutil', 'asyncio', 'tempfile', 'subprocess']
+        # Check required third-party modules without executing them
+        required_modules = ['telegram']
         for module in required_modules:
-            try:
-                __import__(module)
-                logger.debug(f"✅ Module {module} available")
-            except ImportError as e:
-                logger.error(f"❌ Required module {module} not available: {str(e)}")
+            if find_spec(module) is None:
+                logger.error("❌ Required module %s not available", module)
                 return False
+            logger.debug("✅ Module %s available", module)
         
         # Check interpreters
+        versions = probe_interpreter_versions()
         for lang, config in SUPPORTED_LANGUAGES.items():
             cmd = config['cmd'][0]
-            try:
-                result = subprocess.run([cmd, '--version'], 
-                                      capture_output=True, 
-                                      text=True, 
-                                      timeout=5)
-                if result.returncode == 0:
-                    version_info = result.stdout.strip() or result.stderr.strip()
-                    logger.info(f"✅ {lang} interpreter ({cmd}): {version_info.split()[0] if version_info else 'Available'}")
+            outcome = versions[cmd]
+            if isinstance(outcome, Exception):
+                logger.warning("⚠️ %s interpreter (%s) may not be available: %s", lang, cmd, outcome)
+            else:
+                returncode, version_info = outcome
+                if returncode == 0:
+                    logger.info("✅ %s interpreter (%s): %s", lang, cmd, version_info.split()[0] if version_info else 'Available')
                 else:
-                    logger.warning(f"⚠️ {lang} interpreter ({cmd}) available but version check failed")
-            except (subprocess.TimeoutExpired, subprocess.SubprocessError, FileNotFoundError) as e:
-                logger.warning(f"⚠️ {lang} interpreter ({cmd}) may not be available: {str(e)}")
+                    logger.warning("⚠️ %s interpreter (%s) available but version check failed", lang, cmd)
         
         logger.info("✅ Environment validation completed")
         return True
         
     except Exception as e:
-        logger.error(f"❌ Error during environment validation: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("❌ Error during environment validation: %s", e, exc_info=True)
         return False
 
+# Expected shape of a bot token: "<bot id>:<35-character secret>"
+_TOKEN_RE = re.compile(r'^\d{8,10}:[a-zA-Z0-9_-]{35}$')
+
 def get_bot_token() -> Optional[str]:
     """Get bot token from environment or command line with proper error handling"""
     try:
@@ -1158,29 +1356,30 @@ def get_bot_token() -> Optional[str]:
         
         return None
     except Exception as e:
-        logger.error(f"❌ Error getting bot token: {str(e)}")
+        logger.error("❌ Error getting bot token: %s", e)
         return None
 
-def setup_signal_handlers():
-    """Setup signal handlers for graceful shutdown"""
-    def signal_handler(signum, frame):
-        logger.info(f"🛑 Received signal {signum}, shutting down gracefully...")
-        sys.exit(0)
+def install_uvloop() -> None:
+    """Run asyncio on uvloop's libuv-based event loop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("ℹ️ uvloop not installed, using the default asyncio event loop")
+        return
     
     try:
-        signal.signal(signal.SIGTERM, signal_handler)
-        signal.signal(signal.SIGINT, signal_handler)
-        logger.info("✅ Signal handlers setup completed")
+        # Set before the application creates its loop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("✅ uvloop enabled")
     except Exception as e:
-        logger.warning(f"⚠️ Could not setup signal handlers: {str(e)}")
+        logger.warning("⚠️ Could not enable uvloop: %s", e)
 
 def main():
     """Main function with comprehensive error handling"""
     try:
         logger.info("🚀 Starting Code Evaluation Bot")
         
-        # Setup signal handlers
-        setup_signal_handlers()
+        install_uvloop()
         
         # Validate environment
         if not validate_environment():
@@ -1203,7 +1402,7 @@ def main():
             sys.exit(1)
         
         # Validate token format
-        if not re.match(r'^\d{8,10}:[a-zA-Z0-9_-]{35}$', token):
+        if not _TOKEN_RE.match(token):
             logger.warning("⚠️ Bot token format appears invalid")
         
         logger.info("🔧 Creating application")
@@ -1217,6 +1416,10 @@ def main():
             .read_timeout(30.0)
             .write_timeout(30.0)
             .pool_timeout(30.0)
+            .connection_pool_size(256)  # Room for concurrent replies under bursts
+            .get_updates_read_timeout(30.0)  # Added on top of the long-poll timeout
+            .get_updates_pool_timeout(60.0)
+            .concurrent_updates(64)  # A slow eval must not hold up other chats
             .build()
         )
         
@@ -1234,16 +1437,16 @@ def main():
         for command, handler in handlers:
             try:
                 application.add_handler(CommandHandler(command, handler))
-                logger.debug(f"✅ Added handler for /{command}")
+                logger.debug("✅ Added handler for /%s", command)
             except Exception as e:
-                logger.error(f"❌ Failed to add handler for /{command}: {str(e)}")
+                logger.error("❌ Failed to add handler for /%s: %s", command, e)
         
         # Add callback query handler for help expand/minimize
         try:
             application.add_handler(CallbackQueryHandler(help_callback, pattern="^help_"))
             logger.debug("✅ Added callback query handler for help")
         except Exception as e:
-            logger.error(f"❌ Failed to add callback query handler: {str(e)}")
+            logger.error("❌ Failed to add callback query handler: %s", e)
         
         # Add message handler for ?eval, !eval, ?ping, and !ping
         try:
@@ -1253,35 +1456,60 @@ def main():
             ))
             logger.debug("✅ Added message handler for eval messages")
         except Exception as e:
-            logger.error(f"❌ Failed to add message handler: {str(e)}")
+            logger.error("❌ Failed to add message handler: %s", e)
         
         # Add global error handler
         try:
             application.add_error_handler(global_error_handler)
             logger.debug("✅ Added global error handler")
         except Exception as e:
-            logger.error(f"❌ Failed to add error handler: {str(e)}")
+            logger.error("❌ Failed to add error handler: %s", e)
+        
+        # Only the update kinds the handlers above consume; Telegram filters
+        # out the rest server-side
+        allowed_updates = [Update.MESSAGE, Update.CALLBACK_QUERY]
+        
+        public_url = os.getenv('PUBLIC_URL')
+        if public_url:
+            # Telegram pushes updates to us; the webhook server also answers
+            # the platform's port binding, so no keep-alive server is needed
+            port = int(os.getenv('PORT', '8080'))
+            logger.info("🎉 Bot setup completed, starting webhook on port %s...", port)
+            
+            application.run_webhook(
+                listen='0.0.0.0',
+                port=port,
+                url_path=token,
+                webhook_url=f"{public_url.rstrip('/')}/{token}",
+                drop_pending_updates=True,
+                allowed_updates=allowed_updates
+            )
+            return
         
-        # Start dummy HTTP server for deployment platforms
-        try:
-            threading.Thread(target=start_dummy_server, daemon=True).start()
-        except Exception as e:
-            logger.error(f"❌ Failed to start HTTP server: {str(e)}")
+        # Start dummy HTTP server only when the platform asks for a port
+        if os.environ.get("PORT"):
+            try:
+                threading.Thread(target=start_dummy_server, daemon=True).start()
+            except Exception as e:
+                logger.error("❌ Failed to start HTTP server: %s", e)
+        else:
+            logger.info("🌐 No PORT set, skipping keep-alive server")
         
         logger.info("🎉 Bot setup completed, starting polling...")
         
-        # Run the application
+        # Run the application, letting Telegram hold each getUpdates open
+        # for up to 50s so an idle bot makes few round trips
         application.run_polling(
+            timeout=50,
             drop_pending_updates=True,
-            allowed_updates=Update.ALL_TYPES
+            allowed_updates=allowed_updates
         )
         
     except KeyboardInterrupt:
         logger.info("🛑 Bot stopped by user (Ctrl+C)")
         sys.exit(0)
     except Exception as e:
-        logger.error(f"💥 Fatal error in main: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("💥 Fatal error in main: %s", e, exc_info=True)
         print(f"\n❌ FATAL ERROR: {str(e)}")
         print("Check the logs above for more details.")
         sys.exit(1)